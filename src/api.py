@@ -1,9 +1,10 @@
 import asyncio
+import random
 import ssl
 import websockets
-import json
+import orjson
 import logging
-from typing import Optional, Callable, Dict
+from typing import Optional, Callable, Dict, List, Tuple
 from contextlib import asynccontextmanager
 
 from logger import setup_logger
@@ -11,17 +12,38 @@ from auth import LCUAuth
 
 class LCUWebSocket:
     RETRY_INTERVAL = 5  # seconds
+    MAX_BACKOFF = 60  # seconds
     MAX_RETRIES = 3
+    HANDLER_QUEUE_SIZE = 128  # events buffered per subscriber before dropping
+    # Event types whose repeated identical frames must still be delivered
+    COALESCE_EXEMPT = frozenset({'OnJsonApiEvent_lol-chat_v1_conversations'})
 
-    def __init__(self, league_path: str = None, log_level: str = 'INFO'):
+    def __init__(self, league_path: str = None, log_level: str = 'INFO', logger: Optional[logging.Logger] = None):
         self.league_path = league_path
         self.websocket: Optional[websockets.WebSocketClientProtocol] = None
-        self.event_handlers: Dict[str, Callable] = {}
-        self.logger = setup_logger('LCUWebSocket', 'lcu_websocket.log', log_level)
+        # Subscriber queues keyed by full event topic, plus "*" subscriptions that see every event
+        self._exact_handlers: Dict[str, Tuple[str, asyncio.Queue]] = {}
+        self._wildcard_handlers: List[Tuple[str, asyncio.Queue]] = []
+        # Each subscriber callback runs in its own worker task fed by its handler queue
+        self._workers: Dict[str, asyncio.Task] = {}
+        # Hash of the last raw frame seen per event type, used to drop exact repeats
+        self._last_hash_by_type: Dict[str, int] = {}
+        # Event topic and serialized subscribe frame per path, reused when resubscribing after a reconnect
+        self._topic_for_path: Dict[str, str] = {}
+        self._subscribe_frames: Dict[str, str] = {}
+        if logger is not None:
+            self.logger = logger.getChild('LCUWebSocket')
+        else:
+            self.logger = setup_logger('LCUWebSocket', 'lcu_websocket.log', log_level)
         self._running = False
         self._debug = self.logger.isEnabledFor(logging.DEBUG)
         self.auth = LCUAuth(league_path)
 
+        # LCU serves a self-signed cert on localhost; build the context once and reuse it across reconnects
+        self._ssl_ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self._ssl_ctx.check_hostname = False
+        self._ssl_ctx.verify_mode = ssl.CERT_NONE
+
     @asynccontextmanager
     async def connection(self):
         """Context manager for WebSocket connection."""
@@ -31,6 +53,10 @@ class LCUWebSocket:
         finally:
             await self.close()
 
+    def _backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for the given retry attempt."""
+        return random.uniform(0, min(self.MAX_BACKOFF, self.RETRY_INTERVAL * (2 ** attempt)))
+
     async def connect(self):
         """Establish connection to LCU WebSocket with retry logic."""
         for attempt in range(self.MAX_RETRIES):
@@ -39,45 +65,84 @@ class LCUWebSocket:
                 if not port or not auth_token:
                     raise ConnectionError("Failed to obtain authentication details")
                 
-                ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-                
                 uri = f"wss://127.0.0.1:{port}"
-                if self._debug:
-                    self.logger.debug(f"Attempting connection to: {uri}")
-                    self.logger.debug("SSL verification disabled for local connection")
+                self.logger.debug("Attempting connection to: %s", uri)
+                self.logger.debug("SSL verification disabled for local connection")
                 
                 self.websocket = await websockets.connect(
                     uri,
-                    ssl=ssl_context,
-                    extra_headers={"Authorization": f"Basic {auth_token}"}
+                    ssl=self._ssl_ctx,
+                    extra_headers={"Authorization": f"Basic {auth_token}"},
+                    max_size=None,  # gameflow payloads can exceed the 1 MiB default
+                    compression=None  # loopback connection, deflate is pure CPU cost
                 )
-                if self._debug:
-                    self.logger.debug("WebSocket connection established successfully")
+                self.logger.debug("WebSocket connection established successfully")
                 self.logger.info("Connected to LCU WebSocket")
                 break
                 
             except Exception as e:
-                if self._debug:
-                    self.logger.debug(f"Connection error details: {str(e)}")
+                self.logger.debug("Connection error details: %s", e)
                 if attempt == self.MAX_RETRIES - 1:
                     raise ConnectionError(f"Failed to connect after {self.MAX_RETRIES} attempts") from e
-                self.logger.warning(f"Connection attempt {attempt + 1} failed, retrying in {self.RETRY_INTERVAL}s...")
-                await asyncio.sleep(self.RETRY_INTERVAL)
+                delay = self._backoff_delay(attempt)
+                self.logger.warning(f"Connection attempt {attempt + 1} failed, retrying in {delay:.1f}s...")
+                await asyncio.sleep(delay)
 
     async def subscribe(self, event_path: str = "*", callback: Optional[Callable] = None):
         """Subscribe to LCU events."""
         if not self.websocket:
             raise ConnectionError("WebSocket not connected")
 
-        subscribe_msg = [5, f"OnJsonApiEvent{('_' + event_path) if event_path != '*' else ''}"]
-        await self.websocket.send(json.dumps(subscribe_msg))
+        topic = self._topic_for_path.get(event_path)
+        if topic is None:
+            topic = "OnJsonApiEvent" if event_path == '*' else "OnJsonApiEvent_" + event_path
+            self._topic_for_path[event_path] = topic
+        frame = self._subscribe_frames.get(event_path)
+        if frame is None:
+            frame = orjson.dumps([5, topic]).decode()
+            self._subscribe_frames[event_path] = frame
+        await self.websocket.send(frame)
         
         if callback:
-            self.event_handlers[event_path] = callback
+            self._remove_handler(event_path, topic)
+            queue = asyncio.Queue(maxsize=self.HANDLER_QUEUE_SIZE)
+            self._workers[event_path] = asyncio.create_task(self._worker(event_path, callback, queue))
+            if event_path == '*':
+                self._wildcard_handlers.append((event_path, queue))
+            else:
+                self._exact_handlers[topic] = (event_path, queue)
             self.logger.info(f"Subscribed to: {event_path}")
 
+    def _remove_handler(self, event_path: str, topic: str):
+        """Stop the worker and drop the queue of an existing subscription, if any."""
+        worker = self._workers.pop(event_path, None)
+        if worker:
+            worker.cancel()
+        self._exact_handlers.pop(topic, None)
+        self._wildcard_handlers = [entry for entry in self._wildcard_handlers if entry[0] != event_path]
+
+    async def _worker(self, event_path: str, callback: Callable, queue: asyncio.Queue):
+        """Deliver queued events to a subscriber callback in arrival order."""
+        while True:
+            event_data = await queue.get()
+            try:
+                await callback(event_path, event_data)
+            except Exception as e:
+                self.logger.error(f"Error in handler for {event_path}: {e}")
+
+    def _enqueue(self, event_path: str, queue: asyncio.Queue, event_data):
+        """Hand an event to a subscriber without waiting on its callback."""
+        try:
+            queue.put_nowait(event_data)
+        except asyncio.QueueFull:
+            self.logger.warning("Handler %s backpressured; dropping event", event_path)
+
+    async def _resubscribe_all(self):
+        """Replay cached subscribe frames on a fresh connection."""
+        for event_path, frame in self._subscribe_frames.items():
+            await self.websocket.send(frame)
+            self.logger.debug("Resubscribed to: %s", event_path)
+
     async def listen(self):
         """Listen for events with automatic reconnection."""
         self._running = True
@@ -94,6 +159,7 @@ class LCUWebSocket:
                 if self._running:  # Only attempt reconnect if we're not shutting down
                     self.logger.warning("Connection closed, attempting to reconnect...")
                     await self.connect()
+                    await self._resubscribe_all()
                 else:
                     break
             except Exception as e:
@@ -105,29 +171,32 @@ class LCUWebSocket:
 
     async def _handle_message(self, message: str):
         """Process incoming WebSocket messages."""
+        if not self._exact_handlers and not self._wildcard_handlers:
+            return
+
         try:
-            data = json.loads(message)
-            if not isinstance(data, list) or len(data) <= 2:
-                if self._debug:
-                    self.logger.debug(f"Invalid message format - Type: {type(data)}, Content: {data}")
+            message_hash = hash(message)
+            data = orjson.loads(message)
+            # Event frames are [8, event_type, event_data]; 8 is the WAMP event opcode
+            if not (isinstance(data, list) and len(data) > 2 and data[0] == 8):
+                self.logger.debug("Invalid message format - Type: %s, Content: %s", type(data), data)
                 return
-
-            message_id = data[0]  # Message ID is at index 0
             event_type = data[1]
             event_data = data[2]
 
-            # if self._debug:
-            #     self.logger.debug(f"Message ID: {message_id}")
-            #     self.logger.debug(f"Event type received: {event_type}")
-            #     self.logger.debug(f"Event data: {json.dumps(event_data, indent=2)}")
-            #     self.logger.debug(f"Active subscriptions: {list(self.event_handlers.keys())}")
+            if event_type not in self.COALESCE_EXEMPT:
+                if self._last_hash_by_type.get(event_type) == message_hash:
+                    return
+                self._last_hash_by_type[event_type] = message_hash
 
-            for path, handler in self.event_handlers.items():
-                if path in event_type:
-                    await handler(path, event_data)
-        except json.JSONDecodeError:
+            exact = self._exact_handlers.get(event_type)
+            if exact:
+                self._enqueue(exact[0], exact[1], event_data)
+            for path, queue in self._wildcard_handlers:
+                self._enqueue(path, queue, event_data)
+        except orjson.JSONDecodeError:
             if self._debug:
-                self.logger.debug(f"Failed to decode message. Raw content: {message}")
+                self.logger.debug("Failed to decode message. Raw content: %s", message)
             else:
                 self.logger.warning("Failed to decode message")
         except Exception as e:
@@ -135,6 +204,10 @@ class LCUWebSocket:
 
     async def close(self):
         """Clean up resources."""
+        for worker in self._workers.values():
+            worker.cancel()
+        self._workers.clear()
+
         if not self._running:
             return
             
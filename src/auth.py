@@ -1,5 +1,5 @@
 import psutil
-import base64
+import binascii
 import aiofiles
 from pathlib import Path
 from typing import Optional, Tuple
@@ -13,6 +13,8 @@ class LCUAuth:
         self.token: Optional[str] = None
         self.protocol: str = 'https'
         self.base_url: Optional[str] = None
+        # (lockfile mtime_ns, port, token) from the last successful lockfile read
+        self._cache: Optional[Tuple[int, str, str]] = None
         if league_path is None:
             path_finder = LeaguePathFinder()
             found_path = path_finder.find_league_path()
@@ -27,19 +29,32 @@ class LCUAuth:
     async def get_lockfile_auth(self) -> Tuple[Optional[str], Optional[str]]:
         """Get authentication details from lockfile."""
         try:
-            if not self.lockfile_path.exists():
+            try:
+                mtime_ns = self.lockfile_path.stat().st_mtime_ns
+            except FileNotFoundError:
                 self.logger.warning("Lockfile not found")
+                self._cache = None
                 return None, None
 
-            async with aiofiles.open(self.lockfile_path, mode='r') as f:
-                data = await f.read()
+            # The lockfile is only rewritten when the client restarts
+            if self._cache and self._cache[0] == mtime_ns:
+                _, port, auth_token = self._cache
+                self.logger.debug("Using cached lockfile authentication details")
+                return port, auth_token
+
+            # Lockfile is ASCII "name:pid:port:password:protocol"; read bytes to skip decoding the whole file
+            async with aiofiles.open(self.lockfile_path, mode='rb') as f:
+                raw = await f.read()
                 
-                process_name, pid, port, password, protocol = data.split(':')
-                auth_token = base64.b64encode(f"riot:{password}".encode('utf-8')).decode('utf-8')
+                parts = raw.split(b':')
+                pid = parts[1].decode('ascii')
+                port = parts[2].decode('ascii')
+                auth_token = binascii.b2a_base64(b'riot:' + parts[3], newline=False).decode('ascii')
                 
                 self.port = port
                 self.token = auth_token
                 self.base_url = f'{self.protocol}://127.0.0.1:{self.port}'
+                self._cache = (mtime_ns, port, auth_token)
                 self.logger.info(f"Successfully obtained LCU authentication details from lockfile (PID: {pid})")
                 return port, auth_token
 
@@ -47,26 +62,41 @@ class LCUAuth:
             self.logger.error(f"Error getting authentication details from lockfile: {e}")
             return None, None
 
+    def _get_process_auth(self) -> Tuple[Optional[str], Optional[str]]:
+        """Get authentication details from the LeagueClientUx process command line."""
+        # Only request names while scanning; the command line is read for the matching process alone
+        for process in psutil.process_iter(['name']):
+            if process.info['name'] != 'LeagueClientUx.exe':
+                continue
+            try:
+                args = process.cmdline()
+            except psutil.Error as e:
+                self.logger.debug(f"Failed to read LeagueClientUx command line: {e}")
+                continue
+
+            auth_token = next((arg.split('=')[1] for arg in args if arg.startswith('--remoting-auth-token=')), None)
+            port = next((arg.split('=')[1] for arg in args if arg.startswith('--app-port=')), None)
+
+            if auth_token and port:
+                self.port = port
+                self.token = binascii.b2a_base64(b'riot:' + auth_token.encode('ascii'), newline=False).decode('ascii')
+                self.base_url = f'{self.protocol}://127.0.0.1:{self.port}'
+                self.logger.info(f"Successfully obtained LCU authentication details from process (PID: {process.pid})")
+                return port, self.token
+
+        self.logger.warning("LeagueClientUx process not found")
+        return None, None
+
     async def get_auth(self) -> Tuple[Optional[str], Optional[str]]:
-        """Get authentication details, trying process first then lockfile."""
+        """Get authentication details, trying lockfile first then process."""
         try:
-            # Try process-based authentication first
-            for process in psutil.process_iter(['name', 'cmdline']):
-                if process.info['name'] == 'LeagueClientUx.exe':
-                    args = process.info['cmdline']
-                    auth_token = next((arg.split('=')[1] for arg in args if arg.startswith('--remoting-auth-token=')), None)
-                    port = next((arg.split('=')[1] for arg in args if arg.startswith('--app-port=')), None)
-
-                    if auth_token and port:
-                        self.port = port
-                        self.token = base64.b64encode(f'riot:{auth_token}'.encode('utf-8')).decode('utf-8')
-                        self.base_url = f'{self.protocol}://127.0.0.1:{self.port}'
-                        self.logger.info(f"Successfully obtained LCU authentication details from process (PID: {process.pid})")
-                        return port, self.token
+            # The lockfile is a single small read, so try it before scanning processes
+            port, auth_token = await self.get_lockfile_auth()
+            if port and auth_token:
+                return port, auth_token
 
-            # If process auth fails, try lockfile auth
-            self.logger.info("Process-based auth failed, trying lockfile...")
-            return await self.get_lockfile_auth()
+            self.logger.info("Lockfile auth failed, trying process-based auth...")
+            return self._get_process_auth()
 
         except Exception as e:
             self.logger.error(f"Error getting authentication details: {e}")
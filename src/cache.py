@@ -1,8 +1,24 @@
-from dataclasses import dataclass
-from typing import Optional, Dict
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, ClassVar
 
-@dataclass
+@dataclass(slots=True)
 class LCUEventCache:
-    gameflow_session: Optional[Dict] = None
-    champion_select: Optional[Dict] = None
+    MAX_GAME_PATHS: ClassVar[int] = 128
+
+    # Fingerprint of the last gameflow event, used to detect duplicate payloads
+    gameflow_session_hash: Optional[int] = None
     previous_phase: Optional[str] = None
+    # Scalars extracted from the latest gameflow event
+    game_id: int = 0
+    queue_id: int = 0
+    queue_type: str = ""
+    # Recent game_id -> renamed recording path, oldest evicted first
+    game_paths: 'OrderedDict[int, str]' = field(default_factory=OrderedDict)
+
+    def remember_game_path(self, game_id: int, path: str) -> None:
+        """Record the recording path for a game, keeping at most MAX_GAME_PATHS entries"""
+        self.game_paths[game_id] = path
+        self.game_paths.move_to_end(game_id)
+        if len(self.game_paths) > self.MAX_GAME_PATHS:
+            self.game_paths.popitem(last=False)
@@ -19,6 +19,9 @@ class LoggingConfig:
     level: str = "INFO"
     file_path: Optional[str] = None
 
+# Loaded configs keyed by the config_path passed to Config.load
+_cached: Dict[str, 'Config'] = {}
+
 @dataclass
 class Config:
     obs: OBSConfig
@@ -27,8 +30,18 @@ class Config:
     @classmethod
     def load(cls, config_path: str = "config.local.toml") -> 'Config':
         """
-        Load configuration from TOML file with fallback to template
+        Load configuration from TOML file with fallback to template.
+        Repeated loads of the same path return the cached Config.
         """
+        config = _cached.get(config_path)
+        if config is None:
+            config = cls._load(config_path)
+            _cached[config_path] = config
+        return config
+
+    @classmethod
+    def _load(cls, config_path: str) -> 'Config':
+        """Read and parse the config file without consulting the cache"""
         # Start with DEBUG level to catch all initial loading logs
         logger = setup_logger('Config', None, 'DEBUG')
         
@@ -1,6 +1,9 @@
+import atexit
 import logging
+import logging.handlers
+import queue
 from colorama import Fore, Style, init
-from typing import Optional, Union
+from typing import Optional, Union, List, Dict, Tuple
 
 # Initialize colorama for Windows
 init()
@@ -25,11 +28,57 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: Fore.RED + Style.BRIGHT + "[%(asctime)s] %(levelname)s: %(message)s" + Style.RESET_ALL
     }
 
+    def __init__(self):
+        super().__init__()
+        # Build one formatter per level up front instead of one per record
+        self._formatters = {
+            level: logging.Formatter(fmt, datefmt='%Y-%m-%d %H:%M:%S')
+            for level, fmt in self.FORMATS.items()
+        }
+        self._default_formatter = logging.Formatter(
+            "[%(asctime)s] %(levelname)s: %(message)s", datefmt='%Y-%m-%d %H:%M:%S'
+        )
+
     def format(self, record):
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt, datefmt='%Y-%m-%d %H:%M:%S')
+        formatter = self._formatters.get(record.levelno, self._default_formatter)
         return formatter.format(record)
 
+class RoutingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that tags each record with the handlers that should emit it"""
+
+    def __init__(self, log_queue, targets: List[logging.Handler]):
+        super().__init__(log_queue)
+        self.targets = targets
+
+    def prepare(self, record):
+        record = super().prepare(record)
+        record.targets = self.targets
+        return record
+
+class QueueDispatcher(logging.Handler):
+    """Emit records pulled off the log queue through the handlers they were tagged with"""
+
+    def handle(self, record):
+        # Level filtering already happened on the queue handler when the record was logged
+        for handler in getattr(record, 'targets', ()):
+            handler.handle(record)
+        return True
+
+# All loggers enqueue records here; one background listener thread does the console/file I/O
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _ensure_listener():
+    """Start the shared queue listener on first use"""
+    global _listener
+    if _listener is None:
+        _listener = logging.handlers.QueueListener(_log_queue, QueueDispatcher())
+        _listener.start()
+        atexit.register(_listener.stop)
+
+# (log_file, level) each logger name was last configured with
+_configured: Dict[str, Tuple[Optional[str], int]] = {}
+
 def setup_logger(name: str, log_file: Optional[str] = None, log_level: Union[str, int] = 'INFO') -> logging.Logger:
     """Set up and configure a logger with optional file output."""
     if isinstance(log_level, str):
@@ -39,6 +88,19 @@ def setup_logger(name: str, log_file: Optional[str] = None, log_level: Union[str
 
     # Get or create logger for the specific name
     logger = logging.getLogger(name)
+    
+    # Reuse existing handlers when the output file is unchanged, only adjusting the level
+    previous = _configured.get(name)
+    if previous is not None and previous[0] == log_file:
+        if previous[1] != level:
+            logger.setLevel(level)
+            for queue_handler in logger.handlers:
+                queue_handler.setLevel(level)
+                for handler in getattr(queue_handler, 'targets', ()):
+                    handler.setLevel(level)
+            _configured[name] = (log_file, level)
+        return logger
+    
     logger.handlers = []  # Clear any existing handlers
     logger.setLevel(level)  # Set specific level for this logger
     logger.propagate = False  # Prevent propagation to root
@@ -47,7 +109,7 @@ def setup_logger(name: str, log_file: Optional[str] = None, log_level: Union[str
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(CustomFormatter())
     console_handler.setLevel(level)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # Add file handler if specified
     if log_file:
@@ -57,6 +119,13 @@ def setup_logger(name: str, log_file: Optional[str] = None, log_level: Union[str
                             datefmt='%Y-%m-%d %H:%M:%S')
         )
         file_handler.setLevel(level)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # Console/file handlers run on the listener thread; the logger itself only enqueues
+    queue_handler = RoutingQueueHandler(_log_queue, handlers)
+    queue_handler.setLevel(level)
+    logger.addHandler(queue_handler)
+    _ensure_listener()
+    _configured[name] = (log_file, level)
     
     return logger
\ No newline at end of file
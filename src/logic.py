@@ -1,26 +1,90 @@
 import asyncio
+import contextlib
+import logging
 from colorama import Fore, Style, init
-from typing import Dict, Tuple, Union, List, Optional, Callable
+from typing import Dict, Optional, Callable, NamedTuple
 from logger import setup_logger
 from cache import LCUEventCache
 from obs_client import OBSClient
+import orjson
 import os
+import string
+
+try:
+    from asyncio import timeout  # Python 3.11+
+except ImportError:
+    from async_timeout import timeout
 
 # Initialize colorama for Windows
 init()
 
+_GREEN, _YELLOW, _CYAN, _RESET = Fore.GREEN, Fore.YELLOW, Fore.CYAN, Style.RESET_ALL
+_MSG_START_RECORDING = f"{_GREEN}Starting game recording{_RESET}"
+_MSG_STOP_RECORDING = f"{_YELLOW}Stopping game recording{_RESET}"
+
+# Set LCU_TRACE=1 to log every gameflow event, not just phase transitions
+_TRACE = os.environ.get('LCU_TRACE') == '1'
+
+# Shared read-only defaults for missing JSON values; never mutate what these return
+_EMPTY_DICT: dict = {}
+_EMPTY_LIST: tuple = ()
+
+# Queue type -> recording file name fragment, e.g. RANKED_SOLO_5x5 -> rankedsolo5x5
+_LOWER_NO_UNDERSCORE = str.maketrans({c: c.lower() for c in string.ascii_uppercase} | {'_': None})
+_QUEUE_NORMALIZE = {
+    queue_type: queue_type.translate(_LOWER_NO_UNDERSCORE)
+    for queue_type in (
+        'RANKED_SOLO_5x5', 'RANKED_FLEX_SR', 'NORMAL', 'ARAM_UNRANKED_5x5', 'CLASH', 'URF',
+        'PRACTICE_TOOL', 'TUTORIAL_MODULE_1', 'TUTORIAL_MODULE_2', 'TUTORIAL_MODULE_3',
+    )
+}
+
+# Gameflow phase groups
+IN_GAME_PHASES = frozenset({'ReadyCheck', 'ChampSelect'})
+END_PHASES = frozenset({'EndOfGame', 'GameComplete'})
+RESET_PHASES = frozenset({'None', 'Lobby', 'EndOfGame', 'GameComplete'})
+
+# Recording action for a (new phase, currently recording) pair; remaining guards are checked per action
+RECORDING_ACTIONS = {
+    ('ReadyCheck', False): 'start',
+    ('ChampSelect', False): 'start',
+    ('None', True): 'cancel',
+    ('EndOfGame', True): 'stop',
+    ('GameComplete', True): 'stop',
+    ('TerminatedInError', True): 'error',
+    ('Lobby', True): 'dodge',
+    ('Matchmaking', True): 'dodge',
+}
+
+class DodgeInfo(NamedTuple):
+    """Dodge reported in a gameflow session's gameDodge object"""
+    confirmed: bool  # True only for a party dodge during ReadyCheck/ChampSelect
+    phase: str
+    ids: tuple
+
 class LCUGameLogic:
-    def __init__(self, cache: LCUEventCache, log_level: str = 'INFO', obs_password: str = None):
+    __slots__ = (
+        'cache', 'in_game', 'is_recording', 'queue_status', 'handlers', 'logger',
+        'ignored_queue_types', 'obs', 'obs_init_task', 'obs_password', 'log_level',
+        'is_debug', 'obs_ready', 'game_dodge', '_pending_stops',
+    )
+
+    def __init__(self, cache: LCUEventCache, log_level: str = 'INFO', obs_password: str = None,
+                 logger: Optional[logging.Logger] = None):
         self.cache = cache
         self.in_game: bool = False
         self.is_recording: bool = False  # Add recording state tracker
         self.queue_status: str = 'HomeScreen'
+        self.game_dodge: Optional[DodgeInfo] = None
         self.handlers: Dict[str, Callable] = {
             'lol-gameflow_v1_session': self._handle_gameflow
         }
         
-        # Initialize logger with specified level
-        self.logger = setup_logger('LCUGameLogic', 'lcu_game_logic.log', log_level)
+        # Log through the application's logger when given, otherwise configure our own
+        if logger is not None:
+            self.logger = logger.getChild('LCUGameLogic')
+        else:
+            self.logger = setup_logger('LCUGameLogic', 'lcu_game_logic.log', log_level)
         
         # Define game states we don't want to track
         self.ignored_queue_types: set = {
@@ -37,7 +101,7 @@ class LCUGameLogic:
         self.obs_init_task = None
         if obs_password:
             try:
-                self.obs = OBSClient(password=obs_password, timeout=3.0, log_level=log_level)
+                self.obs = OBSClient(password=obs_password, timeout=3.0, log_level=log_level, logger=logger)
                 # Don't create task here, just store parameters
                 self.obs_password = obs_password
                 self.log_level = log_level
@@ -47,16 +111,15 @@ class LCUGameLogic:
 
         self.is_debug = log_level.upper() == 'DEBUG'
         self.obs_ready = asyncio.Event()  # Add this to track OBS initialization
+        self._pending_stops: set = set()  # Background recording stop tasks
 
     async def initialize(self):
         """Initialize async components"""
         if self.obs:
             try:
-                self.logger.debug("Starting OBS initialization in background...")
-                # Create a task for OBS initialization
-                init_task = asyncio.create_task(self._init_obs_async())
-                # Continue initialization without waiting
-                init_task.add_done_callback(lambda _: self.obs_ready.set())
+                self.logger.debug("Starting OBS initialization...")
+                # _init_obs_async sets obs_ready itself, whatever the outcome
+                await self._init_obs_async()
             except Exception as e:
                 self.logger.error(f'Error during OBS initialization: {e}')
                 self.obs = None
@@ -64,9 +127,9 @@ class LCUGameLogic:
     async def _init_obs_async(self):
         """Asynchronous OBS initialization"""
         try:
-            if await self.obs.async_connect():
+            if await self.obs.connect():
                 self.logger.info('OBS client connected successfully')
-                if await self.obs.async_set_profile("League of Legends"):
+                if await self.obs.set_profile("League of Legends"):
                     self.logger.info('OBS profile set successfully')
                 else:
                     self.logger.warning('Failed to set OBS profile')
@@ -78,33 +141,22 @@ class LCUGameLogic:
             # Always set the event, even on failure
             self.obs_ready.set()
 
-    def _check_if_dodge(self, data: Dict) -> Tuple[Union[bool, str], str, List]:
-        """Check if a game dodge occurred"""
-        dodge = data.get('gameDodge', {})
-        
+    def _check_if_dodge(self, dodge: Dict) -> Optional[DodgeInfo]:
+        """Check if a game dodge occurred, given the session's gameDodge object; None when there is none"""
         if not dodge:
-            return False, '', []
+            return None
         
-        if (dodge.get('phase', '') in ['ReadyCheck', 'ChampSelect'] and 
-            dodge.get('state', 'Invalid') == 'PartyDodged'):
-            return True, dodge.get('phase', ''), dodge.get('dodgeIds', [])
-        
-        return 'Unknown', dodge.get('phase', ''), dodge.get('dodgeIds', [])
-    
-    def _get_queue_type(self, data: Dict) -> str:
-        """Extract queue type from game data"""
-        return data.get('gameData', {}).get('queue', {}).get('type', '')
+        phase = dodge.get('phase', '')
+        confirmed = phase in IN_GAME_PHASES and dodge.get('state', 'Invalid') == 'PartyDodged'
+        return DodgeInfo(confirmed, phase, tuple(dodge.get('dodgeIds', _EMPTY_LIST)))
     
-    def _is_data_different(self, new_data: Optional[Dict], cached_data: Optional[Dict]) -> bool:
-        """Check if new data differs from cached data"""
-        if cached_data is None:
-            return True
-        return new_data != cached_data
+    def _fingerprint(self, data: Dict) -> int:
+        """Hash of the canonical JSON encoding, used to detect repeated payloads"""
+        return hash(orjson.dumps(data, option=orjson.OPT_SORT_KEYS))
 
     async def handle_events(self, event_uri: str, data: Dict) -> None:
         """Route events to appropriate handlers"""
-        if self.is_debug:
-            self.logger.debug(f'Event received: {event_uri}')
+        self.logger.debug('Event received: %s', event_uri)
         if event_uri in self.handlers:
             await self.handlers[event_uri](data)
 
@@ -114,16 +166,18 @@ class LCUGameLogic:
             return False
             
         try:
-            await asyncio.wait_for(self.obs_ready.wait(), timeout=5.0)
+            async with timeout(5.0):
+                await self.obs_ready.wait()
             
-            self.logger.info(f"{Fore.GREEN}Starting game recording{Style.RESET_ALL}")
-            self.obs.start_recording()
+            # Let a stop from the previous game finish before starting a new recording
+            if self._pending_stops:
+                await asyncio.gather(*self._pending_stops, return_exceptions=True)
             
-            # Give OBS a moment to start recording
-            await asyncio.sleep(1)
+            self.logger.info(_MSG_START_RECORDING)
+            await self.obs.start_recording()
             
-            # Check if recording actually started
-            if self.obs.is_recording():
+            # Trust the RecordStateChanged event rather than polling GetRecordStatus
+            if await self.obs.wait_for_record_state(True, timeout=3.0):
                 self.is_recording = True  # Update recording state
                 self.logger.info("Recording started successfully")
                 return True
@@ -135,40 +189,42 @@ class LCUGameLogic:
             self.logger.error(f"Error starting recording: {e}")
             return False
 
-    async def _handle_recording_stop(self, queue_type: str, json_data: Dict) -> bool:
+    async def _handle_recording_stop(self, queue_type: str, game_id: int) -> bool:
         """Handle stopping OBS recording and file renaming"""
         if not self.obs:
             return False
             
         try:
-            if not self.obs.is_recording():
+            if self.obs.record_active is False:
                 self.logger.warning("Attempted to stop recording but OBS was not recording")
                 self.is_recording = False  # Ensure state is synced
                 return True
 
-            self.logger.info(f"{Fore.YELLOW}Stopping game recording{Style.RESET_ALL}")
-            self.obs.stop_recording()
+            self.logger.info(_MSG_STOP_RECORDING)
+            await self.obs.stop_recording()
             
-            # Give OBS a moment to stop recording
-            await asyncio.sleep(2)
-            
-            # Verify recording stopped
-            if self.obs.is_recording():
+            # Trust the RecordStateChanged event rather than polling GetRecordStatus
+            if not await self.obs.wait_for_record_state(False, timeout=3.0):
                 self.logger.error("Failed to stop recording")
+                self.is_recording = True  # Still recording, allow a later stop to retry
                 return False
 
             self.is_recording = False  # Update recording state
             # Rest of the rename logic
-            game_id = json_data.get('gameData', {}).get('gameId', 'unknown')
-            if self.is_debug:
-                self.logger.debug(f"Processing recording for game: {game_id}")
+            game_id = game_id or 'unknown'
+            self.logger.debug("Processing recording for game: %s", game_id)
 
             last_path = self.obs.get_last_recording_path()
             if last_path:
-                queue_name = queue_type.lower().replace('_', '')
-                new_name = f"league_{queue_name}_game_{game_id}"
-                new_path = os.path.join(os.path.dirname(last_path), new_name)
-                if not self.obs.modify_last_recording(new_path):
+                new_path = self.cache.game_paths.get(game_id)
+                if new_path is None:
+                    queue_name = _QUEUE_NORMALIZE.get(queue_type) or queue_type.translate(_LOWER_NO_UNDERSCORE)
+                    new_name = f"league_{queue_name}_game_{game_id}"
+                    new_path = os.path.join(os.path.dirname(last_path), new_name)
+                    if game_id != 'unknown':
+                        self.cache.remember_game_path(game_id, new_path)
+                renamed = await self.obs.modify_last_recording(new_path)
+                if not renamed:
                     self.logger.error("Failed to rename recording")
                     return False
             return True
@@ -177,19 +233,42 @@ class LCUGameLogic:
             self.logger.error(f"Error stopping recording: {e}")
             return False
 
+    def _schedule_recording_stop(self, queue_type: str, game_id: int) -> None:
+        """Stop recording in the background so gameflow events keep being processed"""
+        # Mark as stopped before scheduling so the next event doesn't trigger another stop
+        self.is_recording = False
+        task = asyncio.create_task(self._handle_recording_stop(queue_type, game_id))
+        self._pending_stops.add(task)
+        task.add_done_callback(self._pending_stops.discard)
+
     async def _handle_gameflow(self, data: Dict) -> None:
         """Handle gameflow state changes"""
-        if not self._is_data_different(data, self.cache.gameflow_session):
+        json_data = data.get('data') or _EMPTY_DICT
+        current_phase = json_data.get('phase', '')
+        if _TRACE:
+            self.logger.debug("Gameflow event: phase=%s, previous=%s", current_phase, self.cache.previous_phase)
+        
+        # Recording decisions, dodge handling included, only happen on phase transitions,
+        # so same-phase updates (the vast majority) need no further work
+        if current_phase == self.cache.previous_phase:
             return
 
-        self.cache.gameflow_session = data
-        json_data = data.get('data', {})
-        current_phase = json_data.get('phase', '')
-        queue_type = self._get_queue_type(json_data)
+        # Only an ignored queue skips updating previous_phase, so this catches its repeated payloads
+        data_hash = self._fingerprint(data)
+        if data_hash == self.cache.gameflow_session_hash:
+            return
+
+        self.cache.gameflow_session_hash = data_hash
+        game_data = json_data.get('gameData') or _EMPTY_DICT
+        queue = game_data.get('queue') or _EMPTY_DICT
+        queue_type = queue.get('type', '')
+        self.cache.game_id = game_data.get('gameId', 0)
+        self.cache.queue_id = queue.get('id', 0)
+        self.cache.queue_type = queue_type
 
         # Update state
         self.queue_status = current_phase
-        self.game_dodge = self._check_if_dodge(json_data)
+        self.game_dodge = self._check_if_dodge(json_data.get('gameDodge') or _EMPTY_DICT)
         
         # Handle different queue types
         if queue_type in self.ignored_queue_types:
@@ -200,83 +279,85 @@ class LCUGameLogic:
                 self.logger.debug("DEBUG MODE: Recording ignored queue type")
         
         # Log phase changes and update game state
-        if current_phase != self.cache.previous_phase:
-            prev_phase = self.cache.previous_phase or 'None'
-            self.logger.info(
-                f"Matchmaking change: {Fore.CYAN}{prev_phase}{Style.RESET_ALL} -> "
-                f"{Fore.CYAN}{current_phase}{Style.RESET_ALL}"
-            )
-            
-            # Update in_game state based on phase
-            if current_phase in ['ReadyCheck', 'ChampSelect']:
-                self.in_game = True
-            elif current_phase in ['EndOfGame', 'GameComplete', 'None', 'Lobby']:
+        prev_phase = self.cache.previous_phase or 'None'
+        self.logger.info(
+            f"Matchmaking change: {_CYAN}{prev_phase}{_RESET} -> "
+            f"{_CYAN}{current_phase}{_RESET}"
+        )
+        
+        # Update in_game state based on phase
+        if current_phase in IN_GAME_PHASES:
+            self.in_game = True
+        elif current_phase in RESET_PHASES:
+            self.in_game = False
+        elif current_phase == 'TerminatedInError':
+            if queue_type == 'PRACTICE_TOOL':
+                self.logger.debug("Ignoring termination error for Practice Tool")
                 self.in_game = False
-            elif current_phase == 'TerminatedInError':
+        
+        # Handle OBS recording based on game phase
+        if self.obs:
+            action = RECORDING_ACTIONS.get((current_phase, self.is_recording))  # Use tracked state
+            if action == 'start':
+                self.logger.info(f"Starting recording during {current_phase}")
+                await self._handle_recording_start()
+            
+            # Stop recording when transitioning from ReadyCheck/ChampSelect to None
+            elif action == 'cancel' and prev_phase in IN_GAME_PHASES:
+                self.logger.warning(f"Game cancelled during {prev_phase}, stopping recording")
+                self._schedule_recording_stop(queue_type, self.cache.game_id)
+            
+            elif action == 'stop':
+                self._schedule_recording_stop(queue_type, self.cache.game_id)
+                    
+            elif action == 'error':
                 if queue_type == 'PRACTICE_TOOL':
                     self.logger.debug("Ignoring termination error for Practice Tool")
-                    self.in_game = False
-            
-            # Handle OBS recording based on game phase
-            if self.obs:
-                if current_phase in ['ReadyCheck', 'ChampSelect'] and not self.is_recording:
-                    self.logger.info(f"Starting recording during {current_phase}")
-                    await self._handle_recording_start()
-                
-                # Add new condition to stop recording when transitioning from ReadyCheck/ChampSelect to None
-                elif (current_phase == 'None' and 
-                      prev_phase in ['ReadyCheck', 'ChampSelect'] and 
-                      self.is_recording):
-                    self.logger.warning(f"Game cancelled during {prev_phase}, stopping recording")
-                    await self._handle_recording_stop(queue_type, json_data)
-                
-                elif current_phase in ['EndOfGame', 'GameComplete'] and self.is_recording:
-                    await self._handle_recording_stop(queue_type, json_data)
+                else:
+                    self.logger.warning("Game terminated in error")
+                    self._schedule_recording_stop(queue_type, self.cache.game_id)
                         
-                elif current_phase == 'TerminatedInError' and self.is_recording:  # Use tracked state
-                    if queue_type == 'PRACTICE_TOOL':
-                        self.logger.debug("Ignoring termination error for Practice Tool")
-                    else:
-                        self.logger.warning("Game terminated in error")
-                        await self._handle_recording_stop(queue_type, json_data)
-                            
-                elif (current_phase in ['Lobby', 'Matchmaking'] 
-                      and self.game_dodge[0] is True 
-                      and self.is_recording):  # Use tracked state
-                    self.logger.warning(f"Game dodged in phase: {self.game_dodge[1]}, stopping recording")
-                    await self._handle_recording_stop(queue_type, json_data)
-        
-        # Store current phase for next comparison
-        self.cache.previous_phase = current_phase
+            elif action == 'dodge' and self.game_dodge and self.game_dodge.confirmed:
+                self.logger.warning(f"Game dodged in phase: {self.game_dodge.phase}, stopping recording")
+                self._schedule_recording_stop(queue_type, self.cache.game_id)
         
-        # Only log essential debug info
-        if self.is_debug:
+        # Only log essential debug info, once per phase transition
+        if self.logger.isEnabledFor(logging.DEBUG):
             self.logger.debug(
-                f"Game State Update:\n"
-                f"  Phase: {current_phase}\n"
-                f"  Queue: {queue_type}\n"
-                f"  In Game: {self.in_game}\n"
-                f"  Queue Status: {self.queue_status}\n"
-                f"  Game Dodge: {self.game_dodge}\n"
-                f"  Recording: {self.is_recording}"  # Use tracked state instead of querying OBS
+                "Game State Update:\n"
+                "  Phase: %s\n"
+                "  Queue: %s\n"
+                "  In Game: %s\n"
+                "  Queue Status: %s\n"
+                "  Game Dodge: %s\n"
+                "  Recording: %s",
+                current_phase,
+                queue_type,
+                self.in_game,
+                self.queue_status,
+                self.game_dodge,
+                self.is_recording  # Use tracked state instead of querying OBS
             )
 
-    def cleanup(self):
+        # Store current phase for next comparison
+        self.cache.previous_phase = current_phase
+
+    async def cleanup(self):
         """Cleanup resources"""
         try:
+            # Let in-flight stops finish their rename before tearing OBS down
+            if self._pending_stops:
+                await asyncio.gather(*self._pending_stops, return_exceptions=True)
+            
             if self.obs:
+                # OBSClient logs its own failures; there is nothing more to do about them here
                 if self.is_recording:  # Use tracked state
-                    try:
-                        self.obs.stop_recording()
-                    except:
-                        self.logger.debug("Failed to stop recording during cleanup")
+                    with contextlib.suppress(Exception):
+                        await self.obs.stop_recording()
                         
-                # Use synchronous disconnect
-                try:
-                    self.obs.disconnect()
-                except:
-                    self.logger.debug("Failed to shutdown OBS during cleanup")
+                with contextlib.suppress(Exception):
+                    await self.obs.disconnect()
                     
                 self.obs = None
         except Exception as e:
-            self.logger.error(f"Error during cleanup: {e}")
\ No newline at end of file
+            self.logger.error("Error during cleanup: %s", e)
\ No newline at end of file
@@ -22,7 +22,8 @@ async def initialize_components(args):
     # Load configuration
     config = Config.load(args.config)
     
-    main_logger = setup_logger('LCUMain', 
+    # One configured logger for the app; components log through child loggers of it
+    main_logger = setup_logger('LCU', 
                              config.logging.file_path, 
                              config.logging.level)
     main_logger.info(f"Starting application with config from: {args.config}")
@@ -30,8 +31,9 @@ async def initialize_components(args):
     cache = LCUEventCache()
     game_logic = LCUGameLogic(cache, 
                              log_level=config.logging.level, 
-                             obs_password=config.obs.password)
-    client = LCUWebSocket(log_level=config.logging.level)
+                             obs_password=config.obs.password,
+                             logger=main_logger)
+    client = LCUWebSocket(log_level=config.logging.level, logger=main_logger)
     
     # Start async initialization
     await game_logic.initialize()
@@ -43,7 +45,7 @@ async def shutdown(client, game_logic):
     try:
         # Cleanup OBS resources first
         if game_logic:
-            game_logic.cleanup()
+            await game_logic.cleanup()
         
         # Cancel pending tasks
         tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
@@ -57,13 +59,9 @@ async def shutdown(client, game_logic):
             sys.stdout.flush()
             for task in tasks:
                 task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
+            await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Small delay to allow messages to be processed
-        await asyncio.sleep(0.5)
+        await asyncio.get_running_loop().shutdown_asyncgens()
         print("\nGoodbye!")
         sys.stdout.flush()
         
@@ -101,7 +99,19 @@ async def main():
     finally:
         await shutdown(client, game_logic)
 
+def install_event_loop_policy():
+    """Use uvloop (winloop on Windows) for the event loop when it is available."""
+    try:
+        if sys.platform == 'win32':
+            import winloop as loop_impl
+        else:
+            import uvloop as loop_impl
+        loop_impl.install()
+    except ImportError:
+        pass
+
 if __name__ == "__main__":
+    install_event_loop_policy()
     try:
         asyncio_run(main())
     except KeyboardInterrupt:
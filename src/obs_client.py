@@ -1,53 +1,113 @@
-import tracemalloc
-tracemalloc.start()
-
 from logger import setup_logger
 import asyncio
-from obswebsocket import obsws, requests, events  # Changed import
-from typing import Optional, Dict, Any, Callable, Coroutine, Union
-import time
+import base64
+import errno
+import hashlib
+import itertools
+import orjson
+import logging
+import websockets
+from typing import Optional, Dict, Any, Callable, Coroutine, List, Tuple
 import os
+import time
 import shutil
-import concurrent.futures
-import threading
+
+try:
+    # Aliased so it doesn't clash with the timeout parameters below
+    from asyncio import timeout as async_timeout  # Python 3.11+
+except ImportError:
+    from async_timeout import timeout as async_timeout
+
+# Allocation tracing is only for leak hunting; it slows every allocation in the process
+if os.environ.get('OBS_CLIENT_TRACEMALLOC') == '1':
+    import tracemalloc
+    tracemalloc.start()
+
+# obs-websocket v5 opcodes
+_OP_HELLO = 0
+_OP_IDENTIFY = 1
+_OP_IDENTIFIED = 2
+_OP_EVENT = 5
+_OP_REQUEST = 6
+_OP_REQUEST_RESPONSE = 7
+_OP_REQUEST_BATCH = 8
+_OP_REQUEST_BATCH_RESPONSE = 9
+
+# Read-only requests whose concurrent duplicates share one round-trip
+_COALESCED_REQUESTS = frozenset({'GetRecordStatus', 'GetVersion', 'GetProfileList'})
+
+# get_recording_status result when OBS can't be asked; callers get a copy
+_DEFAULT_RECORDING_STATUS = {
+    "isRecording": False,
+    "recordingPaused": False,
+    "recordingTimecode": "",
+    "recordingBytes": 0
+}
+
+# Config (profile changes) and Outputs (RecordStateChanged) event categories
+_EVENT_SUBSCRIPTIONS = (1 << 1) | (1 << 6)
+
+def _expire_future(future: asyncio.Future):
+    """call_later target that fails a still-pending request with a timeout"""
+    if not future.done():
+        future.set_exception(asyncio.TimeoutError())
+
+def run_sync(coro: Coroutine) -> Any:
+    """Run an OBSClient coroutine to completion from synchronous code"""
+    return asyncio.run(coro)
 
 class OBSClient:
-    def __init__(self, host: str = "localhost", port: int = 4455, password: str = "", timeout: float = 3.0, log_level: str = 'INFO'):
+    PROFILE_CACHE_TTL = 30.0  # seconds; profile events also invalidate the cache
+    STATUS_STALE_AFTER = 5.0  # seconds before a cached active-recording status is re-polled
+
+    def __init__(self, host: str = "localhost", port: int = 4455, password: str = "", timeout: float = 3.0, log_level: str = 'INFO',
+                 logger: Optional[logging.Logger] = None):
         """Initialize OBS WebSocket client"""
         self.host = host
         self.port = port
         self.password = password
         self.timeout = 10.0  # Increased default timeout
         self.ws = None
-        self.current_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.current_loop)
         self.last_recording_path = None
         self.connected = False
         self.connection_error = None
         self.last_error = None
         self.response_data = None
-        self._lock = threading.Lock()
         self.operation_timeout = 5  # Increased from 3.0 to 10.0 seconds
         self.ws_timeout = 3.0  # Increased from 5.0 to 10.0 seconds
         self.disconnect_timeout = 10.0  # New longer timeout specifically for disconnect
         
-        # Add shutdown event and task tracking
-        self._shutdown_event = threading.Event()
-        self._tasks = set()
-        self._loop_lock = threading.Lock()
+        # Logger initialization; share the application's logger when given
+        if logger is not None:
+            self.logger = logger.getChild('OBSClient')
+        else:
+            self.logger = setup_logger('OBSClient', 'obs_client.log', log_level)
+        
+        # Requests awaiting their RequestResponse, keyed by requestId
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self._reader_task: Optional[asyncio.Task] = None
+        # In-flight coalesced requests, keyed by request type
+        self._inflight: Dict[str, asyncio.Task] = {}
         
-        # Logger initialization
-        self.logger = setup_logger('OBSClient', 'obs_client.log', log_level)
+        # OBS event handlers keyed by eventType
+        self._event_handlers: Dict[str, Callable[[Dict], None]] = {
+            'RecordStateChanged': self._handle_record_state,
+            'CurrentProfileChanged': self._handle_profile_change,
+            'ProfileListChanged': self._handle_profile_change
+        }
         
-        # Replace simpleobsws with obsws
-        self.ws = obsws(host=host, port=port, password=password)
-        self.ws.register(self._on_event)  # Register event handler
+        # Profile names from the last GetProfileList, and when they were fetched
+        self._profiles_cache: Optional[list] = None
+        self._profiles_cache_ts: float = 0.0
         
-        self.thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="OBSClient")
-        self._main_loop = None
-        self._loop_owner = None
+        # Recording status kept current from RecordStateChanged; None timestamp means unknown
+        self._status_cache: Dict[str, Any] = dict(_DEFAULT_RECORDING_STATUS)
+        self._status_cache_ts: Optional[float] = None
 
-        self._recording_event = asyncio.Event()
+        # Set from RecordStateChanged events; exactly one is set once OBS reports a settled state
+        self._record_started = asyncio.Event()
+        self._record_stopped = asyncio.Event()
         self._recording_state = None
         self._recording_path = None
 
@@ -67,57 +127,133 @@ class OBSClient:
             f"  Timeout: {self.timeout}s"
         )
 
-    def _on_event(self, event):
+    def _auth_response(self, salt: str, challenge: str) -> str:
+        """Build the obs-websocket v5 authentication string for a Hello challenge"""
+        secret = base64.b64encode(hashlib.sha256(((self.password or '') + salt).encode()).digest())
+        return base64.b64encode(hashlib.sha256(secret + challenge.encode()).digest()).decode()
+
+    async def _identify(self):
+        """Complete the Hello/Identify handshake on a freshly opened socket"""
+        hello = orjson.loads(await self.ws.recv())
+        if hello.get('op') != _OP_HELLO:
+            raise ConnectionError(f"Expected Hello from OBS, got op {hello.get('op')}")
+        
+        hello_data = hello.get('d', {})
+        identify = {
+            'rpcVersion': hello_data.get('rpcVersion', 1),
+            'eventSubscriptions': _EVENT_SUBSCRIPTIONS
+        }
+        auth = hello_data.get('authentication')
+        if auth:
+            identify['authentication'] = self._auth_response(auth['salt'], auth['challenge'])
+        await self.ws.send(orjson.dumps({'op': _OP_IDENTIFY, 'd': identify}).decode())
+        
+        identified = orjson.loads(await self.ws.recv())
+        if identified.get('op') != _OP_IDENTIFIED:
+            raise ConnectionError(f"OBS did not accept Identify, got op {identified.get('op')}")
+
+    async def _reader(self):
+        """Route incoming frames: responses to their waiting request, events to _on_event"""
+        try:
+            async for raw in self.ws:
+                message = orjson.loads(raw)
+                op = message.get('op')
+                data = message.get('d') or {}
+                if op == _OP_REQUEST_RESPONSE or op == _OP_REQUEST_BATCH_RESPONSE:
+                    future = self._pending.pop(data.get('requestId'), None)
+                    if future and not future.done():
+                        future.set_result(data)
+                elif op == _OP_EVENT:
+                    self._on_event(data.get('eventType'), data.get('eventData') or {})
+        except websockets.ConnectionClosed as e:
+            self.logger.warning(f"OBS WebSocket closed: {e}")
+        except Exception as e:
+            self.logger.error(f"OBS WebSocket reader error: {e}")
+        finally:
+            self.connected = False
+            # Fail outstanding requests rather than leaving them to time out
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("OBS WebSocket closed"))
+            self._pending.clear()
+
+    def _on_event(self, event_type: str, event_data: Dict):
         """Handle OBS events"""
         try:
-            # Events in obs-websocket don't have type_name, use __class__.__name__ instead
-            event_type = event.__class__.__name__
-            self.logger.debug(f"OBS Event received: {event_type}")
+            self.logger.debug("OBS Event received: %s", event_type)
             
-            # Special handling for record state changes
-            if isinstance(event, events.RecordStateChanged):
-                event_data = event.__dict__.get('datain', {})
-                self.logger.debug(f"Recording state changed: {event.__dict__}")
-                
-                # Update recording state
-                self._recording_state = event_data.get('outputState')
-                if event_data.get('outputPath'):
-                    self._recording_path = event_data['outputPath']
-                
-                # Set event when recording has started
-                if (self._recording_state == 'OBS_WEBSOCKET_OUTPUT_STARTED' 
-                    and event_data.get('outputActive', False)):
-                    self._recording_event.set()
+            handler = self._event_handlers.get(event_type)
+            if handler:
+                handler(event_data)
         except Exception as e:
             self.logger.error(f"Error handling OBS event: {e}")
 
-    def _extract_response_data(self, response, field_name: Optional[str] = None) -> Any:
-        """Extract data from OBS response using consistent pattern"""
+    def _handle_record_state(self, event_data: Dict):
+        """Track RecordStateChanged and wake record-state waiters"""
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Recording state changed: %s", event_data)
+        
+        # Update recording state
+        self._recording_state = event_data.get('outputState')
+        if event_data.get('outputPath'):
+            self._recording_path = event_data['outputPath']
+        
+        # Signal waiters when recording has started or stopped
+        if (self._recording_state == 'OBS_WEBSOCKET_OUTPUT_STARTED' 
+            and event_data.get('outputActive', False)):
+            self._signal_record_state(True)
+        elif (self._recording_state == 'OBS_WEBSOCKET_OUTPUT_STOPPED'
+              and not event_data.get('outputActive', False)):
+            if self._recording_path:
+                self.last_recording_path = self._recording_path
+            self._signal_record_state(False)
+        
+        # Keep the pushed status current so get_recording_status needn't ask OBS
+        if self._recording_state == 'OBS_WEBSOCKET_OUTPUT_STOPPED':
+            self._status_cache = dict(_DEFAULT_RECORDING_STATUS)
+        else:
+            self._status_cache['isRecording'] = event_data.get('outputActive', False)
+            self._status_cache['recordingPaused'] = self._recording_state == 'OBS_WEBSOCKET_OUTPUT_PAUSED'
+        self._status_cache_ts = time.monotonic()
+
+    def _handle_profile_change(self, event_data: Dict):
+        """Drop the cached profile list after a profile event"""
+        self._profiles_cache = None
+
+    def _signal_record_state(self, active: bool):
+        """Flip the started/stopped events to wake anyone waiting on a record state"""
+        if active:
+            self._record_stopped.clear()
+            self._record_started.set()
+        else:
+            self._record_started.clear()
+            self._record_stopped.set()
+
+    @property
+    def record_active(self) -> Optional[bool]:
+        """Recording state from the last RecordStateChanged event, None if none seen since connecting"""
+        if self._record_started.is_set():
+            return True
+        if self._record_stopped.is_set():
+            return False
+        return None
+
+    async def wait_for_record_state(self, active: bool, timeout: float = 3.0) -> bool:
+        """Wait for OBS to report recording started (active=True) or stopped (active=False)"""
+        event = self._record_started if active else self._record_stopped
         try:
-            if not response:
-                return None
-                
-            response_dict = vars(response)
-            if 'datain' not in response_dict:
-                return None
-                
-            datain = response_dict['datain']
-            if not isinstance(datain, dict):
-                return None
-                
-            if field_name:
-                return datain.get(field_name)
-            return datain
-            
-        except Exception as e:
-            self.logger.error(f"Error extracting response data: {e}")
-            return None
+            async with async_timeout(timeout):
+                await event.wait()
+            return True
+        except asyncio.TimeoutError:
+            self.logger.debug(f"No RecordStateChanged event within {timeout}s")
+            return False
 
-    def _process_response(self, response, expected_fields: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Process OBS response and extract relevant data with validation
+    def _process_response(self, data: Optional[Dict], expected_fields: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Process OBS response data with validation
         
         Args:
-            response: Raw OBS response object
+            data: responseData dict returned by _make_request
             expected_fields: Dictionary of field names and their expected types
                            e.g. {'outputActive': bool, 'profiles': list}
         
@@ -125,8 +261,6 @@ class OBSClient:
             Dictionary containing processed data
         """
         try:
-            # Extract base data
-            data = self._extract_response_data(response)
             if not data:
                 return {}
 
@@ -160,65 +294,107 @@ class OBSClient:
             self.logger.error(f"Error processing response: {e}")
             return {}
 
-    async def _make_request(self, request_type: str, data: Dict = None) -> Optional[Dict]:
-        """Make WebSocket request with better error handling"""
+    async def _send_request(self, op: int, payload: Dict, timeout: Optional[float]) -> Dict:
+        """Send a request frame and wait for the response with its requestId; raises on timeout"""
+        request_id = str(next(self._request_ids))
+        payload['requestId'] = request_id
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[request_id] = future
+        try:
+            # Decoded so it goes out as a text frame, which the JSON subprotocol requires
+            await self.ws.send(orjson.dumps({'op': op, 'd': payload}).decode())
+            
+            # A bare call_later handle instead of wait_for's per-request timeout machinery
+            if timeout is None or timeout <= 0:
+                return await future
+            handle = loop.call_later(timeout, _expire_future, future)
+            try:
+                return await future
+            finally:
+                handle.cancel()
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _make_request(self, request_type: str, data: Dict = None, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Send a request and return its responseData ({} if none), or None on failure
+        
+        timeout defaults to ws_timeout; None or <= 0 for both means wait indefinitely.
+        Concurrent calls for the same read-only request share one round-trip and result.
+        """
+        if data or request_type not in _COALESCED_REQUESTS:
+            return await self._request(request_type, data, timeout)
+        
+        inflight = self._inflight.get(request_type)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._request(request_type, None, timeout))
+            self._inflight[request_type] = inflight
+            inflight.add_done_callback(lambda _: self._inflight.pop(request_type, None))
+        # Shielded so one caller giving up doesn't cancel the request for the others
+        return await asyncio.shield(inflight)
+
+    async def _request(self, request_type: str, data: Optional[Dict], timeout: Optional[float]) -> Optional[Dict]:
+        """Send a single request without coalescing"""
         if not self.ws or not self.connected:
             self.logger.error(f"Cannot make request {request_type}: Not connected to OBS")
             return None
 
+        if timeout is None:
+            timeout = self.ws_timeout
         try:
-            # Validate request type exists
-            if not hasattr(requests, request_type):
-                self.logger.error(f"Invalid request type: {request_type}")
-                return None
-            
-            # Create request object based on type
-            request_class = getattr(requests, request_type)
-            
             # Log request attempt
             self.logger.debug(f"Making request: {request_type} with data: {data}")
             
-            # Call with or without data
-            try:
-                if data:
-                    response = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, 
-                            lambda: self.ws.call(request_class(**data))
-                        ),
-                        timeout=self.ws_timeout
-                    )
-                else:
-                    response = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None,
-                            lambda: self.ws.call(request_class())
-                        ),
-                        timeout=self.ws_timeout
-                    )
-                
-                # Log raw response for debugging
-                self.logger.debug(f"Raw response from {request_type}: {response}")
-                
-                # Extract and validate response data
-                extracted_data = self._extract_response_data(response)
-                if extracted_data is None:
-                    self.logger.warning(f"No data extracted from {request_type} response")
-                    
-                return extracted_data
-                
-            except asyncio.TimeoutError:
-                self.logger.error(f"Request {request_type} timed out after {self.ws_timeout}s")
-                return None
-            except AttributeError as ae:
-                self.logger.error(f"Request {request_type} failed: Invalid request format - {ae}")
-                return None
-            except Exception as e:
-                self.logger.error(f"Request {request_type} failed: {str(e)}")
+            request = {'requestType': request_type}
+            if data:
+                request['requestData'] = data
+            response = await self._send_request(_OP_REQUEST, request, timeout)
+            self.logger.debug(f"Raw response from {request_type}: {response}")
+            
+            status = response.get('requestStatus', {})
+            if not status.get('result', False):
+                self.logger.error(
+                    f"Request {request_type} failed: {status.get('comment') or status.get('code')}"
+                )
                 return None
-                
+            return response.get('responseData') or {}
+            
+        except asyncio.TimeoutError:
+            self.logger.error(f"Request {request_type} timed out after {timeout}s")
+            return None
+        except Exception as e:
+            self.logger.error(f"Request {request_type} failed: {str(e)}")
+            return None
+
+    async def _make_batch(self, batch: List[Tuple[str, Optional[Dict]]], timeout: Optional[float] = None) -> Optional[List[Dict]]:
+        """Send several requests in one RequestBatch frame and return their results in order, or None on failure"""
+        if not self.ws or not self.connected:
+            self.logger.error("Cannot make batch request: Not connected to OBS")
+            return None
+
+        if timeout is None:
+            timeout = self.ws_timeout
+        request_types = [request_type for request_type, _ in batch]
+        try:
+            self.logger.debug(f"Making batch request: {request_types}")
+            
+            requests = []
+            for request_type, data in batch:
+                request = {'requestType': request_type}
+                if data:
+                    request['requestData'] = data
+                requests.append(request)
+            response = await self._send_request(
+                _OP_REQUEST_BATCH, {'requests': requests, 'haltOnFailure': False}, timeout
+            )
+            self.logger.debug(f"Raw batch response: {response}")
+            return response.get('results', [])
+            
+        except asyncio.TimeoutError:
+            self.logger.error(f"Batch request {request_types} timed out after {timeout}s")
+            return None
         except Exception as e:
-            self.logger.error(f"Request {request_type} error: {str(e)}")
+            self.logger.error(f"Batch request {request_types} failed: {str(e)}")
             return None
 
     async def _connect(self) -> bool:
@@ -230,42 +406,49 @@ class OBSClient:
             self.response_data = None
             
             try:
-                # Test socket availability and connect
-                await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(None, self.ws.connect),
-                    timeout=self.timeout
+                self.ws = await websockets.connect(
+                    f"ws://{self.host}:{self.port}",
+                    subprotocols=['obswebsocket.json'],
+                    open_timeout=self.timeout,
+                    max_queue=None
                 )
                 self.logger.debug("WebSocket connection successful")
                 
-                # Test connection with version request
-                version_response = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(None, self.ws.call, requests.GetVersion()),
-                    timeout=self.timeout
-                )
-                
-                version_data = self._extract_response_data(version_response)
-                self.response_data = version_data
-                self.logger.debug(f"OBS Version: {version_data}")
-                self.connected = True
+                await asyncio.wait_for(self._identify(), timeout=self.timeout)
+                self.logger.debug("Identified with OBS WebSocket")
 
-                # Reset event state on connection
-                self._recording_event.clear()
+                # Reset event state on connection, before the reader can deliver events
+                self._record_started.clear()
+                self._record_stopped.clear()
                 self._recording_state = None
                 self._recording_path = None
+                self._profiles_cache = None
+                self._status_cache_ts = None
+
+                self._reader_task = asyncio.create_task(self._reader())
+                self.connected = True
+                
+                # Test connection with version request
+                version_data = await self._make_request('GetVersion')
+                if version_data is None:
+                    raise ConnectionError("GetVersion request failed")
+                self.response_data = version_data
+                self.logger.debug(f"OBS Version: {version_data}")
 
                 return True
                 
             except Exception as e:
                 self.last_error = f"Connection failed: {str(e)}"
                 self.logger.error(self.last_error)
+                await self._close_socket()
                 raise
                 
         except Exception as e:
             self.logger.error(f"Failed to connect: {e}")
             return False
 
-    async def async_connect(self) -> bool:
-        """Async version of connect method"""
+    async def connect(self) -> bool:
+        """Connect to OBS, recording any error in connection_error"""
         try:
             return await self._connect()
         except Exception as e:
@@ -275,17 +458,17 @@ class OBSClient:
                 self.connection_error = error_msg
             return False
 
-    def connect(self) -> bool:
-        """Synchronous connect using current loop"""
-        try:
-            loop = self._get_loop()
-            return loop.run_until_complete(self.async_connect())
-        except Exception as e:
-            if str(e) and str(e) != "Unknown error":
-                error_msg = f"Connection error: {str(e)}"
-                self.logger.error(error_msg)
-                self.connection_error = error_msg
-            return False
+    async def _close_socket(self):
+        """Stop the reader task and close the WebSocket"""
+        reader, self._reader_task = self._reader_task, None
+        ws = self.ws
+        if reader and not reader.done():
+            reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+        if ws:
+            await ws.close()
+        self.ws = None
+        self.connected = False
 
     async def _disconnect(self):
         """Async disconnect from OBS WebSocket with improved cleanup"""
@@ -298,35 +481,30 @@ class OBSClient:
             
             # Check recording status with timeout
             try:
-                status = await asyncio.wait_for(
-                    self._make_request('GetRecordStatus'),
-                    timeout=op_timeout
+                # Status check and stop go out in one batch; StopRecord simply fails when idle
+                results = await self._make_batch(
+                    [('GetRecordStatus', None), ('StopRecord', None)], timeout=op_timeout
                 )
-                if status and status.get('outputActive', False):
+                status = (results[0].get('responseData') or {}) if results else {}
+                if status.get('outputActive', False):
                     self.logger.warning("Recording still active during disconnect")
-                    try:
-                        await asyncio.wait_for(
-                            self._make_request('StopRecord'),
-                            timeout=op_timeout
-                        )
-                        # Add small delay for recording to stop
-                        await asyncio.sleep(1)
-                    except asyncio.TimeoutError:
-                        self.logger.warning("Stop recording timed out during disconnect")
+                    if len(results) > 1 and results[1].get('requestStatus', {}).get('result', False):
+                        # Wait for OBS to confirm the output stopped instead of sleeping
+                        if not await self.wait_for_record_state(False, timeout=op_timeout):
+                            self.logger.warning("Recording did not report stopping before disconnect")
+                    else:
+                        self.logger.warning("Stop recording failed during disconnect")
             except Exception as e:
-                self.logger.warning(f"Error checking recording status: {e}")
+                self.logger.warning("Error checking recording status: %s", e)
 
             # Disconnect WebSocket with timeout
             try:
-                disconnect_future = asyncio.get_event_loop().run_in_executor(
-                    None, self.ws.disconnect
-                )
-                await asyncio.wait_for(disconnect_future, timeout=op_timeout)
+                await asyncio.wait_for(self._close_socket(), timeout=op_timeout)
                 self.logger.info("WebSocket disconnected successfully")
             except asyncio.TimeoutError:
                 self.logger.warning("WebSocket disconnect timed out, forcing closure")
             except Exception as e:
-                self.logger.error(f"WebSocket disconnect error: {e}")
+                self.logger.error("WebSocket disconnect error: %s", e)
         finally:
             # Ensure cleanup happens regardless of errors
             self.ws = None
@@ -334,94 +512,44 @@ class OBSClient:
             self._recording_state = None
             self._recording_path = None
 
-    def _ensure_loop_not_running(self):
-        """Ensure the event loop is not running"""
+    async def disconnect(self):
+        """Disconnect from OBS, bounded by disconnect_timeout"""
         try:
-            loop = self._get_loop()
-            if loop.is_running():
-                self.logger.debug("Creating new event loop since current one is running")
-                loop.close()
-                self._main_loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(self._main_loop)
-                return self._main_loop
-            return loop
+            await asyncio.wait_for(self._disconnect(), timeout=self.disconnect_timeout)
+        except asyncio.TimeoutError:
+            self.logger.error("Disconnect timed out after %ss", self.disconnect_timeout)
         except Exception as e:
-            self.logger.error(f"Error ensuring loop not running: {e}")
-            return asyncio.new_event_loop()
-
-    def _run_operation(
-        self, 
-        operation: Union[Callable, Coroutine], 
-        timeout: float = 5.0, 
-        silence_errors: bool = False
-    ) -> Any:
-        """Execute an operation with timeout"""
-        if not self.ws or not self.connected:
-            self.logger.error("Not connected to OBS")
-            return False
+            self.logger.error("Disconnect error: %s", e)
 
-        try:
-            loop = self._get_loop()
-
-            def sync_wrapper():
-                try:
-                    return operation()
-                except Exception as e:
-                    if not silence_errors:
-                        self.logger.error(f"Sync operation failed: {str(e)}")
-                    return False
-
-            # If it's a synchronous operation, run it directly in the thread pool
-            if callable(operation) and not asyncio.iscoroutinefunction(operation):
-                return loop.run_until_complete(
-                    loop.run_in_executor(None, sync_wrapper)
-                )
-
-            # If it's an async operation, run it with timeout
-            async def async_wrapper():
-                try:
-                    if asyncio.iscoroutinefunction(operation):
-                        return await asyncio.wait_for(operation(), timeout=timeout)
-                    elif asyncio.iscoroutine(operation):
-                        return await asyncio.wait_for(operation, timeout=timeout)
-                    else:
-                        raise TypeError(f"Unsupported operation type: {type(operation)}")
-                except asyncio.TimeoutError:
-                    self.logger.error(f"Operation timed out after {timeout}s")
-                    return False
-                except Exception as e:
-                    if not silence_errors:
-                        self.logger.error(f"Async operation failed: {str(e)}")
-                    return False
-
-            if asyncio.iscoroutinefunction(operation) or asyncio.iscoroutine(operation):
-                return loop.run_until_complete(async_wrapper())
+    async def __aenter__(self) -> 'OBSClient':
+        """Connect on entry, raising ConnectionError if OBS can't be reached"""
+        if not await self.connect():
+            raise ConnectionError(self.connection_error or self.last_error or "Failed to connect to OBS")
+        return self
 
-            raise TypeError(f"Unsupported operation type: {type(operation)}")
-
-        except Exception as e:
-            if not silence_errors:
-                self.logger.error(f"Operation execution failed: {str(e)}")
-            return False
+    async def __aexit__(self, exc_type, exc, tb):
+        """Disconnect on exit"""
+        await self.disconnect()
 
     async def _get_profiles(self) -> Optional[list]:
-        """Get list of available OBS profiles with retry"""
+        """Get list of available OBS profiles with retry, cached for PROFILE_CACHE_TTL"""
+        if (self._profiles_cache is not None
+                and time.monotonic() - self._profiles_cache_ts < self.PROFILE_CACHE_TTL):
+            return self._profiles_cache
+        
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                request = requests.GetProfileList()
-                response = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: self.ws.call(request)
-                    ),
-                    timeout=self.ws_timeout
-                )
+                response = await self._make_request('GetProfileList')
                 
                 # Use new processor with expected fields
                 result = self._process_response(response, {'profiles': list})
                 if 'profiles' in result:
-                    return result['profiles']
+                    profiles = result['profiles']
+                    if profiles is not None:
+                        self._profiles_cache = profiles
+                        self._profiles_cache_ts = time.monotonic()
+                    return profiles
 
                 self.logger.warning(f"Attempt {attempt + 1}: Could not find profiles in response")
                 await asyncio.sleep(0.5)
@@ -432,8 +560,8 @@ class OBSClient:
 
         return None
 
-    async def async_set_profile(self, profile_name: str) -> bool:
-        """Async version of set profile"""
+    async def _set_profile(self, profile_name: str) -> bool:
+        """Switch OBS to the named profile if it exists"""
         try:
             # Get profiles with retry
             profiles = await self._get_profiles()
@@ -449,13 +577,12 @@ class OBSClient:
             
             # Set profile directly and trust the response
             try:
-                request = requests.SetCurrentProfile(profileName=profile_name)
                 self.logger.debug(f"Sending profile change request for '{profile_name}'...")
                 
-                response = await asyncio.get_event_loop().run_in_executor(None, self.ws.call, request)
+                response = await self._make_request('SetCurrentProfile', {'profileName': profile_name})
                 self.logger.debug(f"Profile change raw response: {response}")
                 
-                if response:
+                if response is not None:
                     self.logger.info(f"Successfully set profile to '{profile_name}'")
                     return True
                     
@@ -470,19 +597,16 @@ class OBSClient:
             self.logger.error(f"Profile set error: {e}")
             return False
 
-    def set_profile(self, profile_name: str) -> bool:
-        """Synchronous set profile using current loop with better error handling"""
+    async def set_profile(self, profile_name: str) -> bool:
+        """Set the current OBS profile with better error handling"""
         if not self.ws or not self.connected:
             self.logger.error("Not connected to OBS")
             return False
 
         try:
-            loop = self._get_loop()
-            return loop.run_until_complete(
-                asyncio.wait_for(
-                    self.async_set_profile(profile_name),
-                    timeout=self.operation_timeout
-                )
+            return await asyncio.wait_for(
+                self._set_profile(profile_name),
+                timeout=self.operation_timeout
             )
         except asyncio.TimeoutError:
             self.logger.error(f"Profile set operation timed out after {self.operation_timeout}s")
@@ -491,128 +615,75 @@ class OBSClient:
             self.logger.error(f"Failed to set profile: {e}")
             return False
 
-    def start_recording(self) -> bool:
+    async def start_recording(self) -> bool:
         """Start OBS recording"""
-        def _start():
-            if not self.ws:
-                return False
-            try:
-                request = requests.StartRecord()
-                response = self.ws.call(request)
-                status = getattr(response, 'status', None)
-                self.logger.debug(f"Start recording response status: {status}")
-                return status == 'ok'
-            except Exception as e:
-                self.logger.error(f"Start recording failed: {e}")
-                return False
+        response = await self._make_request('StartRecord')
+        self.logger.debug(f"Start recording response: {response}")
+        return response is not None
 
-        return self._run_operation(_start, timeout=5.0, silence_errors=True)
-
-    def stop_recording(self) -> bool:
+    async def stop_recording(self) -> bool:
         """Stop OBS recording"""
-        def _stop():
-            if not self.ws:
-                return False
-            try:
-                request = requests.StopRecord()
-                response = self.ws.call(request)
-                status = getattr(response, 'status', None)
-                self.logger.debug(f"Stop recording response status: {status}")
-                return status == 'ok'
-            except Exception as e:
-                self.logger.error(f"Stop recording failed: {e}")
-                return False
-
-        return self._run_operation(_stop, timeout=5.0, silence_errors=True)
+        response = await self._make_request('StopRecord')
+        self.logger.debug(f"Stop recording response: {response}")
+        return response is not None
 
-    def get_last_recording_path(self) -> Optional[str]:
-        """Get the path of the last recording"""
-        def _get_path():
-            try:
-                request = requests.GetRecordingFolder()
-                response = self.ws.call(request)
-                if response and hasattr(response, 'datain'):
-                    return response.datain.get('recFolder')
-                return None
-            except Exception as e:
-                self.logger.error(f"Get recording path failed: {e}")
-                return None
+    async def get_recording_status(self) -> Dict[str, Any]:
+        """Get recording status, from pushed events when fresh, else via GetRecordStatus
+        
+        Timecode and byte counts aren't pushed, so while recording they are re-polled
+        once the cached status is older than STATUS_STALE_AFTER.
+        """
+        if self._status_cache_ts is not None and (
+                not self._status_cache['isRecording']
+                or time.monotonic() - self._status_cache_ts < self.STATUS_STALE_AFTER):
+            return dict(self._status_cache)
+        
+        try:
+            response = await self._make_request('GetRecordStatus')
+            if response is None:
+                self.logger.warning("Could not get recording status, returning default values")
+                return dict(_DEFAULT_RECORDING_STATUS)
             
-        # Pass regular function since ws.call is synchronous
-        return self._run_operation(_get_path, timeout=5.0, silence_errors=True)
-
-    def modify_last_recording(self, new_path: str) -> bool:
-        """Rename/move the last recording"""
-        def _modify():
-            try:
-                request = requests.SetRecordingFolder(recFolder=os.path.dirname(new_path))
-                response = self.ws.call(request)
-                return getattr(response, 'status', None) == 'ok'
-            except Exception as e:
-                self.logger.error(f"Modify recording failed: {e}")
-                return False
+            # Define expected fields and types
+            expected_fields = {
+                'outputActive': bool,
+                'outputPaused': bool,
+                'outputTimecode': str,
+                'outputBytes': (int, float)  # Accept either type
+            }
             
-        # Pass regular function since ws.call is synchronous
-        return self._run_operation(_modify, timeout=5.0, silence_errors=True)
-
-    def get_recording_status(self) -> Dict[str, Any]:
-        """Get recording status with improved error handling"""
-        async def _get_status():
-            try:
-                response = await self._make_request('GetRecordStatus')
-                if response is None:
-                    self.logger.warning("Could not get recording status, returning default values")
-                    return {
-                        "isRecording": False,
-                        "recordingPaused": False,
-                        "recordingTimecode": "",
-                        "recordingBytes": 0
-                    }
-                
-                # Define expected fields and types
-                expected_fields = {
-                    'outputActive': bool,
-                    'outputPaused': bool,
-                    'outputTimecode': str,
-                    'outputBytes': (int, float)  # Accept either type
-                }
-                
-                # Process response with validation
-                result = self._process_response(response, expected_fields)
-                
-                # Map to our standard format
-                return {
-                    "isRecording": result.get('outputActive', False),
-                    "recordingPaused": result.get('outputPaused', False),
-                    "recordingTimecode": result.get('outputTimecode', ""),
-                    "recordingBytes": result.get('outputBytes', 0)
-                }
-
-            except Exception as e:
-                self.logger.error(f"Error getting recording status: {e}")
-                return {
-                    "isRecording": False,
-                    "recordingPaused": False,
-                    "recordingTimecode": "",
-                    "recordingBytes": 0
-                }
+            # Process response with validation
+            result = self._process_response(response, expected_fields)
+            
+            # Map to our standard format
+            self._status_cache = {
+                "isRecording": result.get('outputActive', False),
+                "recordingPaused": result.get('outputPaused', False),
+                "recordingTimecode": result.get('outputTimecode', ""),
+                "recordingBytes": result.get('outputBytes', 0)
+            }
+            self._status_cache_ts = time.monotonic()
+            return dict(self._status_cache)
 
-        try:
-            return self._run_operation(_get_status())
         except Exception as e:
-            self.logger.error(f"Failed to get recording status: {e}")
-            return {
-                "isRecording": False,
-                "recordingPaused": False,
-                "recordingTimecode": "",
-                "recordingBytes": 0
-            }
+            self.logger.error(f"Error getting recording status: {e}")
+            return dict(_DEFAULT_RECORDING_STATUS)
 
     def get_last_recording_path(self) -> Optional[str]:
         """Return the path of the last recording"""
         return self.last_recording_path
 
-    def modify_last_recording(self, new_path: str) -> bool:
+    async def modify_last_recording(self, new_path: str, timeout: float = 3.0) -> bool:
+        """Move or rename the last recording once OBS reports it stopped writing it"""
+        if not await self.wait_for_record_state(False, timeout=timeout):
+            self.logger.warning("Recording stop not confirmed by OBS, moving file anyway")
+        
+        # File moves can stall on slow or scanned volumes, so keep them off the event loop
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._move_last_recording, new_path
+        )
+
+    def _move_last_recording(self, new_path: str) -> bool:
         """Move or rename the last recording to a new path"""
         if not self.last_recording_path:
             self.logger.error(
@@ -622,9 +693,6 @@ class OBSClient:
             return False
 
         try:
-            # Wait for potential file operations to complete
-            time.sleep(1)
-            
             if not os.path.exists(self.last_recording_path):
                 self.logger.error(f"Source file not found: {self.last_recording_path}")
                 return False
@@ -651,12 +719,13 @@ class OBSClient:
                 self.logger.error(f"Target directory not writable: {target_dir}")
                 return False
 
-            # If target file exists, remove it first
-            if os.path.exists(new_path):
-                os.remove(new_path)
-
-            # Move the file
-            shutil.move(self.last_recording_path, new_path)
+            # Atomic rename, overwriting any existing target; copy only across filesystems
+            try:
+                os.replace(self.last_recording_path, new_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                shutil.move(self.last_recording_path, new_path)
             
             # Verify the move was successful
             if os.path.exists(new_path):
@@ -677,160 +746,52 @@ class OBSClient:
             self.logger.error(f"Failed to modify recording path: {str(e)}")
             return False
 
-    def _cleanup_tasks(self):
-        """Clean up pending tasks"""
-        try:
-            loop = self._get_loop()
-            pending = [t for t in asyncio.all_tasks(loop) if not t.done()]
-            if pending:
-                for task in pending:
-                    task.cancel()
-                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-        except Exception as e:
-            self.logger.error(f"Task cleanup error: {e}")
-
-    def _cleanup_loop(self):
-        """Clean up event loop"""
-        try:
-            if self.current_loop and self.current_loop.is_running():
-                self.current_loop.stop()
-            if self.current_loop and not self.current_loop.is_closed():
-                self.current_loop.close()
-        except Exception as e:
-            self.logger.error(f"Loop cleanup error: {e}")
-
-    def _force_cleanup(self):
-        """Force cleanup of resources with improved task handling"""
-        try:
-            if self._main_loop:
-                # Cancel any pending tasks first
-                try:
-                    loop = self._main_loop
-                    if not loop.is_closed():
-                        pending = [t for t in asyncio.all_tasks(loop) if not t.done()]
-                        if pending:
-                            self.logger.debug(f"Cleaning up {len(pending)} remaining tasks...")
-                            for task in pending:
-                                task.cancel()
-                            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
-                except Exception as e:
-                    self.logger.error(f"Error cleaning up tasks: {e}")
-
-                # Now close the loop
-                if not self._main_loop.is_closed():
-                    self._main_loop.close()
-        except Exception as e:
-            self.logger.error(f"Loop cleanup error: {e}")
-        finally:
-            self.ws = None
-            self.connected = False
-            self.thread_pool = None
-            self._main_loop = None
-            self._loop_owner = None
-
-    def disconnect(self):
-        """Clean disconnect with proper loop and timeout handling"""
-        if not self.ws:
-            return
-
-        try:
-            loop = asyncio.get_event_loop()
-            
-            # If we're already in an event loop, use run_coroutine_threadsafe
-            if loop.is_running():
-                self.logger.debug("Event loop is running, using thread pool for disconnect")
-                future = asyncio.run_coroutine_threadsafe(self._disconnect(), loop)
-                try:
-                    # Use the longer disconnect timeout
-                    future.result(timeout=self.disconnect_timeout)
-                except concurrent.futures.TimeoutError:
-                    self.logger.error(f"Disconnect timed out after {self.disconnect_timeout}s")
-                except Exception as e:
-                    self.logger.error(f"Disconnect error: {e}")
-            else:
-                # If no loop is running, use run_until_complete
-                try:
-                    loop.run_until_complete(
-                        asyncio.wait_for(self._disconnect(), timeout=self.disconnect_timeout)
-                    )
-                except asyncio.TimeoutError:
-                    self.logger.error(f"Disconnect timed out after {self.disconnect_timeout}s")
-                except Exception as e:
-                    self.logger.error(f"Disconnect error: {e}")
-            
-        except Exception as e:
-            self.logger.error(f"Error during disconnect cleanup: {e}")
-        finally:
-            # Clean up thread pool first
-            if self.thread_pool:
-                try:
-                    # Cancel any pending futures
-                    self.thread_pool.shutdown(wait=True)
-                except Exception as e:
-                    self.logger.error(f"Error shutting down thread pool: {e}")
-                finally:
-                    self.thread_pool = None
-            
-            # Force cleanup as last resort
-            self._force_cleanup()
-
-    def _get_loop(self):
-        """Get or create event loop for current thread"""
-        current_thread = threading.current_thread()
-        if self._main_loop is None or self._loop_owner != current_thread:
-            self._main_loop = asyncio.new_event_loop()
-            self._loop_owner = current_thread
-            asyncio.set_event_loop(self._main_loop)
-        return self._main_loop
-
-    def is_recording(self) -> bool:
-        """Check if OBS is currently recording"""
-        try:
-            if not self.ws or not self.ws.ws.connected:
-                return False
-                
-            response = self.ws.call(requests.GetRecordStatus())
-            return getattr(response, 'datain', {}).get('outputActive', False)
-        except Exception as e:
-            self.logger.error(f"Error checking recording status: {e}")
+    async def is_recording(self) -> bool:
+        """Check if OBS is currently recording, asking OBS only before any record event"""
+        if not self.ws or not self.connected:
             return False
+        
+        active = self.record_active
+        if active is not None:
+            return active
+        
+        status = await self._make_request('GetRecordStatus')
+        return bool(status and status.get('outputActive', False))
 
 if __name__ == "__main__":
     # Example usage
-    client = OBSClient(password="EugUfLDwG9cTS01p", log_level='INFO')
-    if client.connect():
-        try:
+    async def _example():
+        async with OBSClient(password="EugUfLDwG9cTS01p", log_level='INFO') as client:
             # Change profile
-            client.set_profile("Valorant")
+            await client.set_profile("Valorant")
             
             # Start recording
-            client.start_recording()
+            await client.start_recording()
             
             # Get recording status
             
-            time.sleep(1)
-            status = client.get_recording_status()
+            await asyncio.sleep(1)
+            status = await client.get_recording_status()
             print(f"Recording status: {status}")
             
             # Wait for 5 seconds
-            time.sleep(5)
+            await asyncio.sleep(5)
             
-            # Stop recording
-            client.stop_recording()
-            
-            # Add longer wait time after stopping recording
-            time.sleep(2)  # Wait for file to be fully written
+            # Stop recording and wait for OBS to finish writing the file
+            await client.stop_recording()
+            await client.wait_for_record_state(False, timeout=5.0)
             
             # Get the last recording path
             last_path = client.get_last_recording_path()
             print(f"Last recording path: {last_path}")
             
-            time.sleep(1)
-            
-            # Modify the last recording path
+            # Modify the last recording path, checking the final status while the file moves
             if last_path:
                 new_path = os.path.join(os.path.dirname(last_path), "renamed_recording")  # Extension will be added automatically
-                client.modify_last_recording(new_path)
-            
-        finally:
-            client.disconnect()
\ No newline at end of file
+                _, status = await asyncio.gather(
+                    client.modify_last_recording(new_path),
+                    client.get_recording_status()
+                )
+                print(f"Recording status after stop: {status}")
+
+    run_sync(_example())
@@ -1,9 +1,52 @@
 import winreg
-import json
+import orjson
+import concurrent.futures
+import ctypes
+import functools
+import os
+import re
+import string
 from pathlib import Path
-from typing import Optional
+from typing import Optional, FrozenSet
 from logger import setup_logger
 
+# install_dir.league_of_legends as a plain string (no escapes), found without parsing the whole file
+_LEAGUE_INSTALL_DIR_RE = re.compile(
+    rb'"install_dir"\s*:\s*\{[^{}]*?"league_of_legends"\s*:\s*"([^"\\]*)"'
+)
+
+# Common installation paths, probed as plain strings to avoid building Path objects
+_COMMON_PATHS = (
+    "C:/Riot Games/League of Legends",
+    "D:/Riot Games/League of Legends",
+    "C:/Program Files/Riot Games/League of Legends",
+    "C:/Program Files (x86)/Riot Games/League of Legends",
+)
+
+_DRIVE_CDROM = 5  # GetDriveTypeW result for optical drives
+
+def _usable_drives() -> Optional[FrozenSet[str]]:
+    """Drive letters worth probing (present and not optical), or None where Windows can't be asked"""
+    try:
+        kernel32 = ctypes.windll.kernel32
+    except AttributeError:
+        return None
+    mask = kernel32.GetLogicalDrives()
+    if not mask:
+        return None
+    return frozenset(
+        letter for i, letter in enumerate(string.ascii_uppercase)
+        if mask >> i & 1 and kernel32.GetDriveTypeW(f"{letter}:\\") != _DRIVE_CDROM
+    )
+
+def _is_league_install(path) -> bool:
+    """True if path is a directory containing LeagueClient.exe, using one directory listing"""
+    try:
+        with os.scandir(path) as entries:
+            return any(entry.name.lower() == 'leagueclient.exe' for entry in entries)
+    except OSError:
+        return False
+
 class LeaguePathFinder:
     def __init__(self):
         self.logger = setup_logger('LeaguePathFinder')
@@ -22,12 +65,17 @@ class LeaguePathFinder:
         """Get League of Legends path from Riot Client settings."""
         try:
             settings_path = riot_client_path / "Config" / "global.json"
-            if not settings_path.exists():
+            if not os.path.isfile(settings_path):
                 return None
 
-            with open(settings_path, 'r') as f:
-                settings = json.load(f)
-                
+            raw = settings_path.read_bytes()
+            match = _LEAGUE_INSTALL_DIR_RE.search(raw)
+            if match:
+                install_dir = match.group(1).decode('utf-8')
+                return Path(install_dir) if install_dir else None
+            
+            # Escaped or unusually laid out values need a real parse
+            settings = orjson.loads(raw)
             install_dir = settings.get("install_dir", {}).get("league_of_legends")
             if install_dir:
                 return Path(install_dir)
@@ -36,28 +84,53 @@ class LeaguePathFinder:
         return None
 
     def find_league_path(self) -> Optional[Path]:
-        """Find League of Legends installation path."""
-        # Common installation paths
-        common_paths = [
-            Path("C:/Riot Games/League of Legends"),
-            Path("D:/Riot Games/League of Legends"),
-            Path("C:/Program Files/Riot Games/League of Legends"),
-            Path("C:/Program Files (x86)/Riot Games/League of Legends"),
-        ]
-
-        # Try getting path from Riot Client first
+        """Find League of Legends installation path, searching only once per process."""
+        return _find_league_path_cached()
+
+    def _get_league_path_from_riot_client(self) -> Optional[Path]:
+        """Get an existing League path via the Riot Client registry entry and settings."""
         riot_client_path = self._get_riot_client_path()
         if riot_client_path:
             league_path = self._get_league_path_from_riot_settings(riot_client_path)
-            if league_path and league_path.exists():
-                self.logger.info(f"Found League path from Riot Client settings: {league_path}")
+            if league_path and _is_league_install(league_path):
                 return league_path
+        return None
+
+    def _scan_common_paths(self) -> Optional[Path]:
+        """Return the first common install location that holds a League client."""
+        # Skip missing and optical drives without touching them; probing those can stall
+        drives = _usable_drives()
+        for path in _COMMON_PATHS:
+            if drives is not None and path[0].upper() not in drives:
+                continue
+            if _is_league_install(path):
+                return Path(path)
+        return None
 
-        # Try common paths
-        for path in common_paths:
-            if path.exists():
+    def _search_league_path(self) -> Optional[Path]:
+        """Search the registry, Riot Client settings and common locations for League."""
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='LeaguePathFinder')
+        try:
+            # Probe the common locations while the registry and settings are read;
+            # the Riot Client answer still wins whenever it has one
+            common_future = pool.submit(self._scan_common_paths)
+            
+            league_path = self._get_league_path_from_riot_client()
+            if league_path:
+                self.logger.info(f"Found League path from Riot Client settings: {league_path}")
+                return league_path
+            
+            path = common_future.result()
+            if path:
                 self.logger.info(f"Found League path in common location: {path}")
                 return path
+        finally:
+            pool.shutdown(wait=False)
 
         self.logger.warning("Could not find League of Legends installation path")
         return None
+
+@functools.lru_cache(maxsize=1)
+def _find_league_path_cached() -> Optional[Path]:
+    """The install location doesn't move while we run, so search for it once"""
+    return LeaguePathFinder()._search_league_path()